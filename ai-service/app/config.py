@@ -24,17 +24,46 @@ class Settings:
     app_host: str = os.getenv("APP_HOST", "0.0.0.0")
     app_port: int = int(os.getenv("PORT") or os.getenv("APP_PORT", "8000"))
     app_env: str = os.getenv("APP_ENV", "development")
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
     service_api_key: str = os.getenv("SERVICE_API_KEY", "")
+    admin_api_key: str = os.getenv("ADMIN_API_KEY", "")
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    openai_cost_per_call: float = float(os.getenv("OPENAI_COST_PER_CALL", "1.0"))
+    local_model_base_url: str = os.getenv("LOCAL_MODEL_BASE_URL", "")
+    local_model_name: str = os.getenv("LOCAL_MODEL_NAME", "local-model")
+    local_model_api_key: str = os.getenv("LOCAL_MODEL_API_KEY", "local")
+    local_cost_per_call: float = float(os.getenv("LOCAL_COST_PER_CALL", "0.0"))
+    provider_timeout_seconds: float = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", "45"))
+    router_window_size: int = int(os.getenv("ROUTER_WINDOW_SIZE", "50"))
+    router_min_samples: int = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))
+    router_hedge_percentile: float = float(os.getenv("ROUTER_HEDGE_PERCENTILE", "0.9"))
+    router_error_penalty_seconds: float = float(os.getenv("ROUTER_ERROR_PENALTY_SECONDS", "10.0"))
+    router_unhealthy_error_rate: float = float(os.getenv("ROUTER_UNHEALTHY_ERROR_RATE", "0.5"))
+    router_cost_weight: float = float(os.getenv("ROUTER_COST_WEIGHT", "1.0"))
+    router_probe_rate: float = float(os.getenv("ROUTER_PROBE_RATE", "0.05"))
+    router_max_workers: int = int(os.getenv("ROUTER_MAX_WORKERS", "16"))
     confidence_threshold: float = float(os.getenv("CONFIDENCE_THRESHOLD", "0.75"))
+    idempotency_ttl_seconds: float = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "900"))
+    idempotency_max_entries: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "2048"))
+    idempotency_wait_seconds: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "55"))
+    exclude_set_ttl_days: float = float(os.getenv("EXCLUDE_SET_TTL_DAYS", "30"))
+    exclude_set_max_sets: int = int(os.getenv("EXCLUDE_SET_MAX_SETS", "256"))
+    coverage_window_days: int = int(os.getenv("COVERAGE_WINDOW_DAYS", "7"))
+    coverage_concept_limit: int = int(os.getenv("COVERAGE_CONCEPT_LIMIT", "3"))
+    coverage_topic_decay: float = float(os.getenv("COVERAGE_TOPIC_DECAY", "0.15"))
+    profiling_sample_interval_ms: float = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "2"))
+    profiling_max_results: int = int(os.getenv("PROFILING_MAX_RESULTS", "50"))
     biology_topics: list[str] = None
 
     def __post_init__(self) -> None:
         if not self.service_api_key:
             raise ValueError("SERVICE_API_KEY is required")
-        if not self.openai_api_key:
-            raise ValueError("OPENAI_API_KEY is required")
+        if not self.openai_api_key and not self.local_model_base_url:
+            raise ValueError("OPENAI_API_KEY or LOCAL_MODEL_BASE_URL is required")
+        if self.provider_timeout_seconds >= self.idempotency_wait_seconds:
+            raise ValueError("PROVIDER_TIMEOUT_SECONDS must be lower than IDEMPOTENCY_WAIT_SECONDS")
         object.__setattr__(self, "biology_topics", _load_biology_topics())
 
 
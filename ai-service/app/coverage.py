@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+
+
+def _day() -> int:
+    return int(time.time() // 86400)
+
+
+class CoverageCounters:
+    def __init__(self, window_days: int, concept_limit: int) -> None:
+        self._window_days = max(1, window_days)
+        self.concept_limit = max(1, concept_limit)
+        self._buckets: dict[int, Counter[tuple[str, ...]]] = {}
+        self._generated = 0
+        self._rejections: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def _bucket(self, day: int) -> Counter[tuple[str, ...]]:
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = Counter()
+            for old in [key for key in self._buckets if key <= day - self._window_days]:
+                del self._buckets[old]
+        return bucket
+
+    def _total(self, key: tuple[str, ...]) -> int:
+        oldest = _day() - self._window_days
+        return max(0, sum(bucket[key] for day, bucket in self._buckets.items() if day > oldest))
+
+    def _add(self, subject: str, topic: str, concept_tag: str, delta: int) -> None:
+        bucket = self._bucket(_day())
+        bucket[("topic", subject, topic)] += delta
+        bucket[("concept", subject, topic, concept_tag)] += delta
+
+    def record(self, subject: str, topic: str, concept_tag: str) -> None:
+        with self._lock:
+            self._add(subject, topic, concept_tag, 1)
+            self._generated += 1
+
+    def record_rejection(self, subject: str, topic: str, concept_tag: str, reason: str) -> None:
+        with self._lock:
+            self._rejections[reason] += 1
+            if reason == "topicRepetition":
+                # The backend only rejects for repetition once the concept hit its limit, so pin it as saturated.
+                current = self._total(("concept", subject, topic, concept_tag))
+                if current < self.concept_limit:
+                    self._add(subject, topic, concept_tag, self.concept_limit - current)
+            elif self._total(("concept", subject, topic, concept_tag)) > 0:
+                # Any other rejection never reaches a paper, so it should not count towards coverage.
+                # Replayed or unseen questions were never recorded, so there may be nothing to take back.
+                self._add(subject, topic, concept_tag, -1)
+
+    def seed(self, counts: list[tuple[str, str, str, int]]) -> None:
+        # Replaces in-process state with the backend's authoritative window counts, all attributed to today.
+        with self._lock:
+            self._buckets.clear()
+            for subject, topic, concept_tag, count in counts:
+                self._add(subject, topic, concept_tag, count)
+
+    def topic_count(self, subject: str, topic: str) -> int:
+        with self._lock:
+            return self._total(("topic", subject, topic))
+
+    def saturated_concepts(self, subject: str, topic: str) -> list[str]:
+        with self._lock:
+            concepts = {
+                key[3]
+                for bucket in self._buckets.values()
+                for key in bucket
+                if key[0] == "concept" and key[1] == subject and key[2] == topic
+            }
+            return sorted(tag for tag in concepts if self._total(("concept", subject, topic, tag)) >= self.concept_limit)
+
+    def metrics(self) -> dict[str, object]:
+        with self._lock:
+            rejected = sum(self._rejections.values())
+            return {
+                "generated": self._generated,
+                "rejectedDownstream": rejected,
+                "rejectionsByReason": dict(self._rejections),
+                "wasteRatio": round(rejected / self._generated, 4) if self._generated else 0.0,
+            }
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ExcludeSet:
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl = ttl_seconds
+        self._expiry: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.touched_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def add(self, hashes: list[str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.touched_at = now
+            expires_at = now + self._ttl
+            for value in hashes:
+                self._expiry[value] = expires_at
+
+    def purge_expired(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [value for value, expires_at in self._expiry.items() if expires_at <= now]
+            for value in expired:
+                del self._expiry[value]
+
+    def __contains__(self, value: str) -> bool:
+        expires_at = self._expiry.get(value)
+        return expires_at is not None and expires_at > time.monotonic()
+
+
+class ExcludeSetRegistry:
+    def __init__(self, ttl_seconds: float, max_sets: int) -> None:
+        self._ttl = ttl_seconds
+        self._max_sets = max(1, max_sets)
+        self._sets: OrderedDict[str, ExcludeSet] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        stale = [set_id for set_id, entry in self._sets.items() if entry.touched_at + self._ttl <= now]
+        for set_id in stale:
+            del self._sets[set_id]
+        while len(self._sets) > self._max_sets:
+            self._sets.popitem(last=False)
+
+    def get(self, set_id: str) -> ExcludeSet | None:
+        with self._lock:
+            self._evict()
+            return self._sets.get(set_id)
+
+    def replace(self, set_id: str, hashes: list[str]) -> ExcludeSet:
+        entry = ExcludeSet(self._ttl)
+        entry.add(hashes)
+        with self._lock:
+            self._sets[set_id] = entry
+            self._sets.move_to_end(set_id)
+            self._evict()
+        return entry
+
+    def append(self, set_id: str, hashes: list[str]) -> ExcludeSet | None:
+        # Appending to a missing set would hide that its uploaded hashes were lost; callers must re-upload.
+        with self._lock:
+            self._evict()
+            entry = self._sets.get(set_id)
+            if entry is None:
+                return None
+            self._sets.move_to_end(set_id)
+        entry.add(hashes)
+        entry.purge_expired()
+        return entry
+
+    def delete(self, set_id: str) -> bool:
+        with self._lock:
+            return self._sets.pop(set_id, None) is not None
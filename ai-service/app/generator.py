@@ -12,6 +12,10 @@ except ImportError:
     OpenAI = None
 
 from app.config import settings
+from app.coverage import CoverageCounters
+from app.exclude_sets import ExcludeSetRegistry
+from app.observability import note, note_rejection, stage
+from app.providers import ModelProvider, ProviderRouter
 from app.schemas import GeneratedQuestion, GenerateQuestionRequest
 from app.syllabus2026 import NEET_2026_SYLLABUS_UNITS, QUESTION_FORMATS
 from app.topics import assert_topic_allowed
@@ -32,9 +36,10 @@ _contradiction_patterns = [
 
 _unit_pattern = re.compile(r"\b(m/s|m s-1|m/s\^2|N|J|W|Pa|K|mol|g|kg|cm|mm|L|mL|V|A|ohm|Hz)\b", re.IGNORECASE)
 
-_openai_client = None
-if OpenAI and settings.openai_api_key:
-    _openai_client = OpenAI(api_key=settings.openai_api_key)
+coverage = CoverageCounters(
+    window_days=settings.coverage_window_days,
+    concept_limit=settings.coverage_concept_limit,
+)
 
 
 def _normalize_text(value: str) -> str:
@@ -74,11 +79,16 @@ def pick_weighted_topic(request: GenerateQuestionRequest) -> str:
     available = [item for item in request.topicWeights if item.topic in request.topics]
     if not available:
         available = request.topicWeights
-    total = sum(item.weight for item in available)
+    # Topics already heavily covered this window are down-weighted so the backend's repeat limit is hit less often.
+    weights = [
+        item.weight / (1 + settings.coverage_topic_decay * coverage.topic_count(request.subject, item.topic))
+        for item in available
+    ]
+    total = sum(weights)
     threshold = random.random() * total
     cumulative = 0.0
-    for item in available:
-        cumulative += item.weight
+    for item, weight in zip(available, weights):
+        cumulative += weight
         if cumulative >= threshold:
             return item.topic
     return available[-1].topic
@@ -126,6 +136,8 @@ def _verification_flag(confidence: float, regenerated: bool) -> Literal["Verifie
 
 def _build_prompt(request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> str:
     excluded = ", ".join(request.excludeHashes[-120:]) if request.excludeHashes else "none"
+    saturated = coverage.saturated_concepts(request.subject, topic)[:20]
+    avoided = ", ".join(saturated) if saturated else "none"
 
     return (
         "Generate exactly one NEET UG 2026 MCQ and return strict JSON only. "
@@ -142,39 +154,20 @@ def _build_prompt(request: GenerateQuestionRequest, topic: str, syllabus_unit: s
         f"Use syllabusUnit exactly as: {syllabus_unit}. "
         "Allowed sourceType values: Conceptual, Numerical, Application. "
         "Allowed questionFormat values: Single Correct, Assertion-Reason, Statement I-II, Multi-Statement, Case-Based. "
-        f"Avoid semantic duplicates of these recent hashes: {excluded}."
+        f"Avoid semantic duplicates of these recent hashes: {excluded}. "
+        f"Do not use these conceptTag values, they are already used too often this week: {avoided}."
     )
 
 
-def _from_openai(request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> GeneratedQuestion:
-    if _openai_client is None:
-        raise RuntimeError("OpenAI client unavailable")
+exclude_set_registry = ExcludeSetRegistry(
+    ttl_seconds=settings.exclude_set_ttl_days * 86400,
+    max_sets=settings.exclude_set_max_sets,
+)
 
-    response = _openai_client.responses.create(
-        model=settings.openai_model,
-        input=[
-            {
-                "role": "system",
-                "content": [{"type": "input_text", "text": "Return compact JSON only without markdown fences."}],
-            },
-            {
-                "role": "user",
-                "content": [{"type": "input_text", "text": _build_prompt(request, topic, syllabus_unit)}],
-            },
-        ],
-        temperature=0.35,
-    )
+_SYSTEM_PROMPT = "Return compact JSON only without markdown fences."
 
-    raw = (response.output_text or "").strip()
-    if not raw:
-        chunks: list[str] = []
-        for item in getattr(response, "output", []) or []:
-            for content in getattr(item, "content", []) or []:
-                text = getattr(content, "text", None)
-                if text:
-                    chunks.append(str(text))
-        raw = "\n".join(chunks).strip()
 
+def _parse_question(raw: str) -> GeneratedQuestion:
     if not raw:
         raise RuntimeError("Empty response from model")
 
@@ -187,6 +180,113 @@ def _from_openai(request: GenerateQuestionRequest, topic: str, syllabus_unit: st
     return GeneratedQuestion(**parsed)
 
 
+class OpenAIProvider(ModelProvider):
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str, cost_per_call: float, timeout: float) -> None:
+        # The router does its own failover and hedging, so SDK retries would only hide failures from its stats.
+        self._client = OpenAI(api_key=api_key, timeout=timeout, max_retries=0)
+        self._model = model
+        self.cost_per_call = cost_per_call
+
+    def generate(self, request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> GeneratedQuestion:
+        response = self._client.responses.create(
+            model=self._model,
+            input=[
+                {
+                    "role": "system",
+                    "content": [{"type": "input_text", "text": _SYSTEM_PROMPT}],
+                },
+                {
+                    "role": "user",
+                    "content": [{"type": "input_text", "text": _build_prompt(request, topic, syllabus_unit)}],
+                },
+            ],
+            temperature=0.35,
+        )
+
+        raw = (response.output_text or "").strip()
+        if not raw:
+            chunks: list[str] = []
+            for item in getattr(response, "output", []) or []:
+                for content in getattr(item, "content", []) or []:
+                    text = getattr(content, "text", None)
+                    if text:
+                        chunks.append(str(text))
+            raw = "\n".join(chunks).strip()
+
+        return _parse_question(raw)
+
+
+class LocalHTTPProvider(ModelProvider):
+    name = "local"
+
+    def __init__(self, base_url: str, api_key: str, model: str, cost_per_call: float, timeout: float) -> None:
+        # Local servers (llama.cpp, vLLM, Ollama) expose the OpenAI-compatible chat completions API.
+        self._client = OpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0)
+        self._model = model
+        self.cost_per_call = cost_per_call
+
+    def generate(self, request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> GeneratedQuestion:
+        response = self._client.chat.completions.create(
+            model=self._model,
+            messages=[
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": _build_prompt(request, topic, syllabus_unit)},
+            ],
+            temperature=0.35,
+        )
+        raw = (response.choices[0].message.content or "").strip() if response.choices else ""
+        return _parse_question(raw)
+
+
+class TemplateProvider(ModelProvider):
+    name = "fallback"
+
+    def generate(self, request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> GeneratedQuestion:
+        return _fallback_question(request, topic, syllabus_unit)
+
+
+def _build_providers() -> list[ModelProvider]:
+    providers: list[ModelProvider] = []
+    if OpenAI is None:
+        return providers
+    if settings.openai_api_key:
+        providers.append(
+            OpenAIProvider(
+                settings.openai_api_key,
+                settings.openai_model,
+                settings.openai_cost_per_call,
+                settings.provider_timeout_seconds,
+            )
+        )
+    if settings.local_model_base_url:
+        providers.append(
+            LocalHTTPProvider(
+                settings.local_model_base_url,
+                settings.local_model_api_key,
+                settings.local_model_name,
+                settings.local_cost_per_call,
+                settings.provider_timeout_seconds,
+            )
+        )
+    return providers
+
+
+provider_router = ProviderRouter(
+    providers=_build_providers(),
+    fallback=TemplateProvider(),
+    window=settings.router_window_size,
+    min_samples=settings.router_min_samples,
+    hedge_percentile=settings.router_hedge_percentile,
+    error_penalty_seconds=settings.router_error_penalty_seconds,
+    unhealthy_error_rate=settings.router_unhealthy_error_rate,
+    cost_weight=settings.router_cost_weight,
+    probe_rate=settings.router_probe_rate,
+    max_workers=settings.router_max_workers,
+)
+
+
 def _format_specific_options(question_format: str, truth_pattern: str = "A") -> tuple[dict[str, str], str]:
     if question_format == "Assertion-Reason":
         options = {
@@ -482,30 +582,36 @@ def generate_question(
         assert_topic_allowed(request.subject, topic)
 
     hash_exclude = set(request.excludeHashes)
+    exclude_set = exclude_set_registry.get(request.excludeSetId) if request.excludeSetId else None
 
     for attempt in range(12):
         topic = pick_weighted_topic(request)
         assert_topic_allowed(request.subject, topic)
         syllabus_unit = _pick_syllabus_unit(request)
-
-        source = "fallback"
-        try:
-            question = _from_openai(request, topic, syllabus_unit)
-            source = "openai"
-        except Exception:
-            question = _fallback_question(request, topic, syllabus_unit)
-            source = "fallback"
-
-        _validate_question(question, request, topic, syllabus_unit)
-        signature = hash_signature(question)
-        confidence = _confidence(question)
-
-        if signature in hash_exclude:
+        note(attempts=attempt + 1, topic=topic, syllabusUnit=syllabus_unit)
+
+        with stage("model"):
+            question, source = provider_router.generate(request, topic, syllabus_unit)
+        note(source=source)
+        with stage("validation"):
+            try:
+                _validate_question(question, request, topic, syllabus_unit)
+            except ValueError as exc:
+                note_rejection(f"validation: {exc}")
+                raise
+            signature = hash_signature(question)
+            confidence = _confidence(question)
+        note(confidence=round(confidence, 4))
+
+        if signature in hash_exclude or (exclude_set is not None and signature in exclude_set):
+            note_rejection("hashDuplicate")
             continue
         if _is_uncertain(question):
+            note_rejection("lowConfidence")
             continue
 
         verification_flag = _verification_flag(confidence, regenerated=attempt > 0)
+        coverage.record(question.subject, question.topic, question.conceptTag)
         return question, signature, confidence, source, verification_flag
 
     raise RuntimeError("Unable to generate high-confidence unique NEET-style question")
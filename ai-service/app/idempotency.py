@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class IdempotencyConflictError(ValueError):
+    pass
+
+
+class IdempotencyPendingError(RuntimeError):
+    pass
+
+
+class _Entry(Generic[T]):
+    __slots__ = ("fingerprint", "done", "result", "error", "expires_at")
+
+    def __init__(self, fingerprint: str) -> None:
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+        self.expires_at = float("inf")
+
+
+def payload_fingerprint(raw: str) -> str:
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore(Generic[T]):
+    def __init__(self, ttl_seconds: float, max_entries: int, wait_seconds: float) -> None:
+        self._ttl = ttl_seconds
+        self._wait = wait_seconds
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, _Entry[T]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        while len(self._entries) > self._max_entries:
+            for key, entry in self._entries.items():
+                if entry.done.is_set():
+                    del self._entries[key]
+                    break
+            else:
+                break
+
+    def run(self, key: str, fingerprint: str, compute: Callable[[], T]) -> T:
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry.fingerprint != fingerprint:
+                raise IdempotencyConflictError("Idempotency-Key reused with a different request payload")
+            owner = entry is None
+            if owner:
+                entry = _Entry(fingerprint)
+                self._entries[key] = entry
+
+        if not owner:
+            if not entry.done.wait(self._wait):
+                raise IdempotencyPendingError("Request with this Idempotency-Key is still in progress")
+            if entry.error is not None:
+                raise entry.error
+            return entry.result
+
+        try:
+            entry.result = compute()
+        except BaseException as exc:
+            entry.error = exc
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            raise
+        finally:
+            entry.done.set()
+
+        with self._lock:
+            entry.expires_at = time.monotonic() + self._ttl
+            self._entries.move_to_end(key)
+            self._evict(time.monotonic())
+        return entry.result
@@ -1,15 +1,40 @@
 from __future__ import annotations
 
+import hmac
 import logging
-from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
-from app.generator import generate_question
-from app.schemas import GenerateQuestionRequest, GenerateQuestionResponse
+from app.generator import coverage, exclude_set_registry, generate_question
+from app.idempotency import IdempotencyConflictError, IdempotencyPendingError, IdempotencyStore, payload_fingerprint
+from app.observability import TraceMiddleware, configure_logging, dropped_log_records, note
+from app.profiling import Profiler
+from app.providers import inline_providers
+from app.schemas import (
+    CoverageRejection,
+    CoverageSeed,
+    ExcludeSetInfo,
+    ExcludeSetUpload,
+    GenerateQuestionRequest,
+    GenerateQuestionResponse,
+    ProfilingRequest,
+)
 from app.topics import BIOLOGY_TOPICS
 
+configure_logging(settings.log_level, settings.log_queue_size)
 app = FastAPI(title="NEET AI Generator", version="1.0.0")
+app.add_middleware(TraceMiddleware)
 logger = logging.getLogger("ai-service")
+idempotency_store: IdempotencyStore[GenerateQuestionResponse] = IdempotencyStore(
+    ttl_seconds=settings.idempotency_ttl_seconds,
+    max_entries=settings.idempotency_max_entries,
+    wait_seconds=settings.idempotency_wait_seconds,
+)
+profiler = Profiler(
+    sample_interval_ms=settings.profiling_sample_interval_ms,
+    max_results=settings.profiling_max_results,
+)
 
 
 def verify_api_key(x_api_key: str = Header(default="")) -> None:
@@ -19,18 +44,30 @@ def verify_api_key(x_api_key: str = Header(default="")) -> None:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
 
+def _is_admin(x_admin_key: str) -> bool:
+    return bool(settings.admin_api_key) and hmac.compare_digest(x_admin_key.encode(), settings.admin_api_key.encode())
+
+
+def verify_admin_key(x_admin_key: str = Header(default="")) -> None:
+    if not settings.admin_api_key:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not _is_admin(x_admin_key):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
 @app.get("/health")
-def health() -> dict[str, str | bool]:
+def health() -> dict[str, str | bool | int]:
     return {
         "ok": True,
         "service": "ai-service",
         "openai_enabled": bool(settings.openai_api_key),
+        "local_model_enabled": bool(settings.local_model_base_url),
         "biology_topics_loaded": bool(BIOLOGY_TOPICS),
+        "log_records_dropped": dropped_log_records(),
     }
 
 
-@app.post("/generate-question", response_model=GenerateQuestionResponse, dependencies=[Depends(verify_api_key)])
-def generate_question_endpoint(payload: GenerateQuestionRequest) -> GenerateQuestionResponse:
+def _generate(payload: GenerateQuestionRequest) -> GenerateQuestionResponse:
     try:
         question, signature, confidence, source, verification_flag = generate_question(payload)
         return GenerateQuestionResponse(
@@ -41,11 +78,119 @@ def generate_question_endpoint(payload: GenerateQuestionRequest) -> GenerateQues
             source=source,
         )
     except ValueError as exc:
-        logger.warning("Validation failed for generated question: %s", str(exc))
+        note(error=str(exc))
+        logger.warning("Validation failed for generated question", extra={"fields": {"error": str(exc)}})
         raise HTTPException(status_code=400, detail="Invalid generation request") from exc
     except RuntimeError as exc:
-        logger.error("Generation runtime error: %s", str(exc))
+        note(error=str(exc))
+        logger.error("Generation runtime error", extra={"fields": {"error": str(exc)}})
         raise HTTPException(status_code=422, detail="Question generation failed") from exc
     except Exception as exc:
+        note(error=type(exc).__name__)
         logger.exception("Unexpected generation error")
         raise HTTPException(status_code=500, detail="Internal server error") from exc
+
+
+@app.post("/generate-question", response_model=GenerateQuestionResponse, dependencies=[Depends(verify_api_key)])
+def generate_question_endpoint(
+    payload: GenerateQuestionRequest,
+    response: Response,
+    idempotency_key: str = Header(default="", max_length=255),
+    x_debug_profile: str = Header(default=""),
+    x_admin_key: str = Header(default=""),
+) -> GenerateQuestionResponse:
+    if payload.excludeSetId and exclude_set_registry.get(payload.excludeSetId) is None:
+        raise HTTPException(status_code=404, detail="Exclude set not found")
+
+    def compute() -> GenerateQuestionResponse:
+        mode = profiler.claim(x_debug_profile if x_debug_profile and _is_admin(x_admin_key) else None)
+        if mode is None:
+            return _generate(payload)
+        # Provider calls normally run on the router's worker pool; keep them on this thread so the profile covers them.
+        with inline_providers():
+            result, profile_id = profiler.run(mode, f"{payload.subject}/{payload.questionFormat}", lambda: _generate(payload))
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+        return result
+
+    if not idempotency_key:
+        return compute()
+    try:
+        return idempotency_store.run(
+            idempotency_key,
+            payload_fingerprint(payload.model_dump_json()),
+            compute,
+        )
+    except (IdempotencyConflictError, IdempotencyPendingError) as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@app.put("/exclude-sets/{set_id}", response_model=ExcludeSetInfo, dependencies=[Depends(verify_api_key)])
+def replace_exclude_set(set_id: str, payload: ExcludeSetUpload) -> ExcludeSetInfo:
+    entry = exclude_set_registry.replace(set_id, payload.hashes)
+    return ExcludeSetInfo(id=set_id, size=len(entry))
+
+
+@app.post("/exclude-sets/{set_id}/hashes", response_model=ExcludeSetInfo, dependencies=[Depends(verify_api_key)])
+def append_exclude_set(set_id: str, payload: ExcludeSetUpload) -> ExcludeSetInfo:
+    entry = exclude_set_registry.append(set_id, payload.hashes)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Exclude set not found")
+    return ExcludeSetInfo(id=set_id, size=len(entry))
+
+
+@app.get("/exclude-sets/{set_id}", response_model=ExcludeSetInfo, dependencies=[Depends(verify_api_key)])
+def get_exclude_set(set_id: str) -> ExcludeSetInfo:
+    entry = exclude_set_registry.get(set_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Exclude set not found")
+    return ExcludeSetInfo(id=set_id, size=len(entry))
+
+
+@app.delete("/exclude-sets/{set_id}", dependencies=[Depends(verify_api_key)])
+def delete_exclude_set(set_id: str) -> dict[str, bool]:
+    if not exclude_set_registry.delete(set_id):
+        raise HTTPException(status_code=404, detail="Exclude set not found")
+    return {"ok": True}
+
+
+@app.post("/coverage/rejections", dependencies=[Depends(verify_api_key)])
+def report_coverage_rejection(payload: CoverageRejection) -> dict[str, bool]:
+    coverage.record_rejection(payload.subject, payload.topic, payload.conceptTag, payload.reason)
+    return {"ok": True}
+
+
+@app.put("/coverage/concepts", dependencies=[Depends(verify_api_key)])
+def seed_coverage(payload: CoverageSeed) -> dict[str, bool]:
+    coverage.seed([(item.subject, item.topic, item.conceptTag, item.count) for item in payload.counts])
+    return {"ok": True}
+
+
+@app.get("/coverage/metrics", dependencies=[Depends(verify_api_key)])
+def coverage_metrics() -> dict[str, object]:
+    return coverage.metrics()
+
+
+@app.get("/admin/profiling", dependencies=[Depends(verify_admin_key)])
+def profiling_status() -> dict[str, object]:
+    return profiler.status()
+
+
+@app.post("/admin/profiling", dependencies=[Depends(verify_admin_key)])
+def arm_profiling(payload: ProfilingRequest) -> dict[str, object]:
+    profiler.arm(payload.mode, payload.requests)
+    return profiler.status()
+
+
+@app.delete("/admin/profiling", dependencies=[Depends(verify_admin_key)])
+def disarm_profiling() -> dict[str, object]:
+    profiler.disarm()
+    return profiler.status()
+
+
+@app.get("/admin/profiling/{profile_id}", response_class=PlainTextResponse, dependencies=[Depends(verify_admin_key)])
+def profiling_result(profile_id: str) -> str:
+    result = profiler.get(profile_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return result.output
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterator
+
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="-")
+summary_var: ContextVar[dict[str, Any] | None] = ContextVar("request_summary", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "traceId": getattr(record, "trace_id", "-"),
+            "msg": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class _TraceFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Runs on the calling thread, before the record crosses the queue and loses its context.
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+class _StructuredQueueHandler(QueueHandler):
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Never block or grow without bound when the writer falls behind; count what is shed instead.
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the record unformatted; JSON encoding happens on the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _BlockingSentinelListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue is bounded; wait for the listener to drain room for the shutdown sentinel.
+        self.queue.put(self._sentinel)
+
+
+_listener: QueueListener | None = None
+_handler: _StructuredQueueHandler | None = None
+
+
+def configure_logging(level: str = "INFO", queue_size: int = 10000) -> None:
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=max(1, queue_size))
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    _listener = _BlockingSentinelListener(log_queue, stream, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    _handler = _StructuredQueueHandler(log_queue)
+    _handler.addFilter(_TraceFilter())
+    logger = logging.getLogger("ai-service")
+    logger.handlers = [_handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+
+def dropped_log_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+def start_summary(**fields: Any) -> dict[str, Any]:
+    summary: dict[str, Any] = {"attempts": 0, "rejections": [], "stagesMs": {}, **fields}
+    summary_var.set(summary)
+    return summary
+
+
+def note(**fields: Any) -> None:
+    summary = summary_var.get()
+    if summary is not None:
+        summary.update(fields)
+
+
+def note_rejection(reason: str) -> None:
+    summary = summary_var.get()
+    if summary is not None:
+        summary["rejections"].append(reason)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    summary = summary_var.get()
+    if summary is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = summary["stagesMs"]
+        stages[name] = round(stages.get(name, 0.0) + (time.perf_counter() - started) * 1000, 3)
+
+
+class TraceMiddleware:
+    def __init__(self, app, logger_name: str = "ai-service", quiet_paths: tuple[str, ...] = ("/health",)) -> None:
+        self.app = app
+        self._logger = logging.getLogger(logger_name)
+        self._quiet_paths = quiet_paths
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        raw = headers.get(b"x-trace-id") or headers.get(b"x-request-id")
+        trace_id = raw.decode("latin-1")[:128] if raw else uuid.uuid4().hex
+        trace_token = trace_id_var.set(trace_id)
+        summary = start_summary(method=scope["method"], path=scope["path"])
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_trace(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", trace_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            summary["status"] = status_code
+            summary["durationMs"] = round((time.perf_counter() - started) * 1000, 3)
+            level = logging.DEBUG if scope["path"] in self._quiet_paths else logging.INFO
+            self._logger.log(level, "request completed", extra={"fields": summary})
+            trace_id_var.reset(trace_token)
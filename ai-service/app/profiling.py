@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Literal, TypeVar
+
+T = TypeVar("T")
+ProfileMode = Literal["cprofile", "sampling"]
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+@dataclass
+class ProfileResult:
+    id: str
+    mode: ProfileMode
+    label: str
+    started_at: float
+    duration_ms: float
+    output: str = field(repr=False)
+
+
+def _collapse(frame) -> str:
+    parts: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class _Sampler:
+    def __init__(self, target_thread_id: int, interval: float) -> None:
+        self._target = target_thread_id
+        self._interval = interval
+        self._stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="profiling-sampler", daemon=True)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self._stacks[_collapse(frame)] += 1
+
+    def __enter__(self) -> _Sampler:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+
+class Profiler:
+    def __init__(self, sample_interval_ms: float, max_results: int) -> None:
+        self._sample_interval = max(0.0001, sample_interval_ms / 1000)
+        self._max_results = max(1, max_results)
+        self._results: OrderedDict[str, ProfileResult] = OrderedDict()
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        self._remaining = 0
+        self._mode: ProfileMode = "cprofile"
+
+    def arm(self, mode: ProfileMode, requests: int) -> None:
+        with self._lock:
+            self._mode = mode
+            self._remaining = requests
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._remaining = 0
+
+    def status(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "armed": self._remaining > 0,
+                "mode": self._mode,
+                "remaining": self._remaining,
+                "results": [
+                    {"id": r.id, "mode": r.mode, "label": r.label, "startedAt": r.started_at, "durationMs": r.duration_ms}
+                    for r in self._results.values()
+                ],
+            }
+
+    def get(self, profile_id: str) -> ProfileResult | None:
+        with self._lock:
+            return self._results.get(profile_id)
+
+    def claim(self, requested: str | None = None) -> ProfileMode | None:
+        # Unlocked read keeps the disabled path to a single attribute check.
+        if not self._remaining and not requested:
+            return None
+        if requested in PROFILE_MODES:
+            return requested
+        with self._lock:
+            if self._remaining <= 0:
+                return None
+            self._remaining -= 1
+            return self._mode
+
+    def run(self, mode: ProfileMode, label: str, fn: Callable[[], T]) -> tuple[T, str | None]:
+        profile_id = uuid.uuid4().hex
+        started_at = time.time()
+        started = time.perf_counter()
+        if mode == "sampling":
+            sampler = _Sampler(threading.get_ident(), self._sample_interval)
+            try:
+                with sampler:
+                    result = fn()
+            finally:
+                self._store(profile_id, mode, label, started_at, started, sampler.collapsed())
+        else:
+            # Only one cProfile session may be active per interpreter; overlapping requests run unprofiled.
+            if not self._cprofile_lock.acquire(blocking=False):
+                return fn(), None
+            profile = cProfile.Profile()
+            try:
+                result = profile.runcall(fn)
+            finally:
+                self._cprofile_lock.release()
+                buffer = io.StringIO()
+                pstats.Stats(profile, stream=buffer).sort_stats("cumulative").print_stats(60)
+                self._store(profile_id, mode, label, started_at, started, buffer.getvalue())
+        return result, profile_id
+
+    def _store(self, profile_id: str, mode: ProfileMode, label: str, started_at: float, started: float, output: str) -> None:
+        result = ProfileResult(
+            id=profile_id,
+            mode=mode,
+            label=label,
+            started_at=started_at,
+            duration_ms=round((time.perf_counter() - started) * 1000, 3),
+            output=output,
+        )
+        with self._lock:
+            self._results[profile_id] = result
+            while len(self._results) > self._max_results:
+                self._results.popitem(last=False)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from app.schemas import GeneratedQuestion, GenerateQuestionRequest
+
+_inline_var: ContextVar[bool] = ContextVar("provider_inline", default=False)
+
+
+@contextmanager
+def inline_providers() -> Iterator[None]:
+    # Keeps provider calls on the current thread, e.g. so a profiler attached to it sees the SDK and parsing work.
+    token = _inline_var.set(True)
+    try:
+        yield
+    finally:
+        _inline_var.reset(token)
+
+
+class ModelProvider(ABC):
+    name: str = "provider"
+    cost_per_call: float = 0.0
+
+    @abstractmethod
+    def generate(self, request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> GeneratedQuestion: ...
+
+
+class RollingStats:
+    def __init__(self, window: int) -> None:
+        self._samples: deque[tuple[float, bool]] = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def count(self) -> int:
+        return len(self._samples)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+    def percentile(self, p: float, successful_only: bool = True) -> float | None:
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok or not successful_only)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, max(0, int(round(p * (len(latencies) - 1)))))
+        return latencies[index]
+
+
+class ProviderRouter:
+    def __init__(
+        self,
+        providers: list[ModelProvider],
+        fallback: ModelProvider,
+        window: int,
+        min_samples: int,
+        hedge_percentile: float,
+        error_penalty_seconds: float,
+        unhealthy_error_rate: float,
+        cost_weight: float,
+        probe_rate: float,
+        max_workers: int,
+    ) -> None:
+        self.providers = providers
+        self.fallback = fallback
+        self.stats = {provider.name: RollingStats(window) for provider in providers}
+        self._min_samples = min_samples
+        self._hedge_percentile = hedge_percentile
+        self._error_penalty_seconds = error_penalty_seconds
+        self._unhealthy_error_rate = unhealthy_error_rate
+        self._cost_weight = cost_weight
+        self._probe_rate = probe_rate
+        self._executor = ThreadPoolExecutor(max_workers=max(2, max_workers), thread_name_prefix="provider")
+
+    def score(self, provider: ModelProvider) -> tuple[bool, float]:
+        stats = self.stats[provider.name]
+        cost = self._cost_weight * provider.cost_per_call
+        if stats.count() < self._min_samples:
+            # Unexplored providers go first, whatever their cost, until they have enough samples to rank.
+            return False, float("-inf")
+        error_rate = stats.error_rate()
+        # Failed calls count towards latency too, so a provider that fails slowly is not mistaken for a fast one.
+        latency = stats.percentile(0.5, successful_only=False) or 0.0
+        unhealthy = error_rate >= self._unhealthy_error_rate
+        return unhealthy, latency + self._error_penalty_seconds * error_rate + cost
+
+    def ranked(self) -> list[ModelProvider]:
+        ranked = sorted(self.providers, key=self.score)
+        if len(ranked) > 1 and random.random() < self._probe_rate:
+            # Occasionally lead with a lower-ranked provider so its stats stay current and a recovered tier is noticed.
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def _hedge_delay(self, provider: ModelProvider) -> float | None:
+        stats = self.stats[provider.name]
+        if stats.count() < self._min_samples:
+            return None
+        # With no recent successes there is nothing to wait for, so hedge straight away.
+        return stats.percentile(self._hedge_percentile) or 0.0
+
+    def _timed(self, provider: ModelProvider, request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> GeneratedQuestion:
+        started = time.perf_counter()
+        try:
+            question = provider.generate(request, topic, syllabus_unit)
+        except Exception:
+            self.stats[provider.name].record(time.perf_counter() - started, False)
+            raise
+        self.stats[provider.name].record(time.perf_counter() - started, True)
+        return question
+
+    def _submit(self, provider: ModelProvider, request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> Future:
+        return self._executor.submit(self._timed, provider, request, topic, syllabus_unit)
+
+    def _generate_inline(self, request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> tuple[GeneratedQuestion, str]:
+        # No hedging and no stats: inline calls are instrumented and would skew the rolling latencies.
+        for provider in self.ranked():
+            try:
+                return provider.generate(request, topic, syllabus_unit), provider.name
+            except Exception:
+                continue
+        return self.fallback.generate(request, topic, syllabus_unit), self.fallback.name
+
+    def generate(self, request: GenerateQuestionRequest, topic: str, syllabus_unit: str) -> tuple[GeneratedQuestion, str]:
+        if _inline_var.get():
+            return self._generate_inline(request, topic, syllabus_unit)
+        queue = self.ranked()
+        pending: dict[Future, ModelProvider] = {}
+
+        while queue or pending:
+            if not pending:
+                provider = queue.pop(0)
+                pending[self._submit(provider, request, topic, syllabus_unit)] = provider
+
+            primary = next(iter(pending.values()))
+            timeout = self._hedge_delay(primary) if queue and len(pending) == 1 else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                hedge = queue.pop(0)
+                pending[self._submit(hedge, request, topic, syllabus_unit)] = hedge
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                if future.exception() is None:
+                    return future.result(), provider.name
+
+        return self.fallback.generate(request, topic, syllabus_unit), self.fallback.name
@@ -25,6 +25,7 @@ class GenerateQuestionRequest(BaseModel):
     questionFormat: QuestionFormat = "Single Correct"
     syllabusUnits: list[str] = Field(default_factory=list)
     excludeHashes: list[str] = Field(default_factory=list)
+    excludeSetId: str | None = Field(default=None, min_length=1, max_length=128)
 
     @field_validator("topics")
     @classmethod
@@ -59,4 +60,36 @@ class GenerateQuestionResponse(BaseModel):
     hashSignature: str
     confidence: float = Field(ge=0, le=1)
     verificationFlag: VerificationFlag
-    source: Literal["openai", "fallback"]
+    source: Literal["openai", "local", "fallback"]
+
+
+class ExcludeSetUpload(BaseModel):
+    hashes: list[str] = Field(default_factory=list, max_length=50000)
+
+
+class ExcludeSetInfo(BaseModel):
+    id: str
+    size: int
+
+
+class CoverageRejection(BaseModel):
+    subject: Subject
+    topic: str
+    conceptTag: str = Field(min_length=1)
+    reason: str = Field(min_length=1, max_length=64)
+
+
+class ConceptCount(BaseModel):
+    subject: Subject
+    topic: str
+    conceptTag: str = Field(min_length=1)
+    count: int = Field(ge=0)
+
+
+class CoverageSeed(BaseModel):
+    counts: list[ConceptCount] = Field(default_factory=list, max_length=20000)
+
+
+class ProfilingRequest(BaseModel):
+    mode: Literal["cprofile", "sampling"] = "cprofile"
+    requests: int = Field(default=1, ge=1, le=500)
@@ -10,19 +10,67 @@ const client = axios.create({
   }
 });
 
-export const generateQuestionFromAi = async ({ subject, topics, topicWeights, difficulty, questionFormat, syllabusUnits, excludeHashes }) => {
-  const response = await client.post("/generate-question", {
-    subject,
-    topics,
-    topicWeights,
-    difficulty,
-    questionFormat,
-    syllabusUnits,
-    excludeHashes
-  });
+export const generateQuestionFromAi = async ({
+  subject,
+  topics,
+  topicWeights,
+  difficulty,
+  questionFormat,
+  syllabusUnits,
+  excludeHashes,
+  excludeSetId,
+  traceId,
+  idempotencyKey
+}) => {
+  const headers = {};
+  if (traceId) headers["x-trace-id"] = traceId;
+  if (idempotencyKey) headers["idempotency-key"] = idempotencyKey;
+
+  const response = await client.post(
+    "/generate-question",
+    {
+      subject,
+      topics,
+      topicWeights,
+      difficulty,
+      questionFormat,
+      syllabusUnits,
+      excludeHashes,
+      ...(excludeSetId ? { excludeSetId } : {})
+    },
+    { headers }
+  );
   return response.data;
 };
 
+export const createAiExcludeSet = async (setId, hashes) => {
+  await client.put(`/exclude-sets/${encodeURIComponent(setId)}`, { hashes });
+};
+
+export const appendAiExcludeSet = async (setId, hashes) => {
+  try {
+    await client.post(`/exclude-sets/${encodeURIComponent(setId)}/hashes`, { hashes });
+  } catch (error) {
+    logger.debug({ err: error }, "AI exclude set append failed");
+  }
+};
+
+export const seedAiCoverage = async (counts) => {
+  try {
+    await client.put("/coverage/concepts", { counts });
+  } catch (error) {
+    logger.warn({ err: error }, "AI coverage seed failed");
+  }
+};
+
+export const reportAiRejection = async ({ subject, topic, conceptTag, reason }) => {
+  try {
+    await client.post("/coverage/rejections", { subject, topic, conceptTag, reason });
+  } catch (error) {
+    logger.debug({ err: error }, "AI coverage rejection report failed");
+  }
+};
+
 export const warmupAi = async () => {
   try {
     await client.get("/health");
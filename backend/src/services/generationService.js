@@ -1,9 +1,16 @@
+import { randomUUID } from "node:crypto";
 import cron from "node-cron";
 import { query, pool } from "../db/postgres.js";
 import { redis } from "../db/redis.js";
 import { BIOLOGY_TOPICS, CHEMISTRY_TOPICS, PHYSICS_TOPICS } from "../config/topics.js";
 import { getSyllabusUnitsForTopic } from "../config/syllabus2026.js";
-import { generateQuestionFromAi } from "./aiClient.js";
+import {
+  appendAiExcludeSet,
+  createAiExcludeSet,
+  generateQuestionFromAi,
+  reportAiRejection,
+  seedAiCoverage
+} from "./aiClient.js";
 import { hashQuestion, semanticSimilarity, validateQuestionShape } from "./questionValidation.js";
 import { getIstDateString } from "../utils/date.js";
 import { logger } from "../utils/logger.js";
@@ -264,6 +271,7 @@ const hasSuccessfulGenerationLog = async (runDate) => {
 
 export const generateDailyPaper = async ({ forceDate, triggeredBy = "system", adaptiveProfile = null } = {}) => {
   const runDate = forceDate || getIstDateString();
+  const runId = randomUUID();
   const isAdminRegenerate = triggeredBy === "admin-regenerate";
   const semanticThreshold = isAdminRegenerate ? ADMIN_REGENERATE_SEMANTIC_THRESHOLD : SEMANTIC_SIMILARITY_THRESHOLD;
   const maxSlotAttempts = isAdminRegenerate ? 60 : 20;
@@ -296,7 +304,41 @@ export const generateDailyPaper = async ({ forceDate, triggeredBy = "system", ad
     const recentHashes = await getRecentHashes();
     const recentContexts = await getRecentQuestionContext();
     const topicConceptCounts = await getTopicConceptCounts7d();
+    await seedAiCoverage(
+      Object.entries(topicConceptCounts).map(([key, count]) => {
+        const [subject, topic, ...conceptParts] = key.split("::");
+        return { subject, topic, conceptTag: conceptParts.join("::"), count };
+      })
+    );
     const selectedHashes = new Set();
+    const uploadExcludeSet = async () => {
+      const setId = `paper-${runDate}-${runId}`;
+      try {
+        await createAiExcludeSet(setId, [...recentHashes, ...selectedHashes]);
+        return setId;
+      } catch (error) {
+        logger.warn({ err: error }, "AI exclude set upload failed; sending hashes per request");
+        return null;
+      }
+    };
+    let excludeSetId = await uploadExcludeSet();
+    const requestAiQuestion = async (payload) => {
+      const send = () =>
+        generateQuestionFromAi({
+          ...payload,
+          excludeHashes: excludeSetId ? [] : [...selectedHashes, ...recentHashes].slice(-2000),
+          excludeSetId
+        });
+      try {
+        return await send();
+      } catch (error) {
+        if (!excludeSetId || error.response?.status !== 404) throw error;
+        // The ai-service keeps sets in memory; a restart or eviction loses them mid-run.
+        logger.warn({ excludeSetId }, "AI exclude set missing; re-uploading");
+        excludeSetId = await uploadExcludeSet();
+        return send();
+      }
+    };
     const generatedTexts = [];
     const generated = [];
     const rejectionStats = {
@@ -326,25 +368,36 @@ export const generateDailyPaper = async ({ forceDate, triggeredBy = "system", ad
 
         while (!accepted && slotAttempts < maxSlotAttempts) {
           slotAttempts += 1;
-          const aiPayload = await generateQuestionFromAi({
+          const slotTraceId = `gen-${runDate}-${runId}-${subject}-${i + 1}-${slotAttempts}`;
+          const aiPayload = await requestAiQuestion({
             subject,
             topics,
             topicWeights: adaptiveWeights,
             difficulty: requiredDifficulty,
             questionFormat: requiredFormat,
             syllabusUnits: syllabusUnitPool,
-            excludeHashes: [...selectedHashes, ...recentHashes].slice(-2000)
+            traceId: slotTraceId,
+            idempotencyKey: slotTraceId
           });
 
         const candidate = {
           ...aiPayload.question,
           difficulty: aiPayload.question.difficulty || requiredDifficulty
         };
+        const rejectCandidate = (reason) => {
+          rejectionStats[reason] += 1;
+          void reportAiRejection({
+            subject,
+            topic: candidate.topic,
+            conceptTag: candidate.conceptTag || "unknown",
+            reason
+          });
+        };
         const confidence = Number(aiPayload.confidence ?? 0);
         const verificationFlag = aiPayload.verificationFlag || "Estimated";
 
         if (confidence < MIN_CONFIDENCE) {
-          rejectionStats.confidence += 1;
+          rejectCandidate("confidence");
           continue;
         }
 
@@ -352,36 +405,36 @@ export const generateDailyPaper = async ({ forceDate, triggeredBy = "system", ad
           candidate.difficulty = requiredDifficulty;
         }
         if (candidate.questionFormat !== requiredFormat) {
-          rejectionStats.formatMismatch += 1;
+          rejectCandidate("formatMismatch");
           continue;
         }
         const allowedSyllabusUnits = getSyllabusUnitsForTopic(subject, candidate.topic);
         if (!allowedSyllabusUnits.includes(candidate.syllabusUnit)) {
-          rejectionStats.syllabusMismatch += 1;
+          rejectCandidate("syllabusMismatch");
           continue;
         }
 
         const validation = validateQuestionShape(candidate);
         if (!validation.valid) {
-          rejectionStats.validation += 1;
+          rejectCandidate("validation");
           continue;
         }
 
         const hash = hashQuestion(candidate);
         if (selectedHashes.has(hash) || recentHashes.has(hash) || (await existsInRedis(hash))) {
-          rejectionStats.hashDuplicate += 1;
+          rejectCandidate("hashDuplicate");
           continue;
         }
 
         if (hasHighSemanticSimilarity(candidate.questionText, recentContexts, generatedTexts, semanticThreshold)) {
-          rejectionStats.semanticDuplicate += 1;
+          rejectCandidate("semanticDuplicate");
           continue;
         }
 
         const conceptKey = `${subject}::${candidate.topic}::${candidate.conceptTag}`;
         const repeated = topicConceptCounts[conceptKey] || 0;
         if (!isAdminRegenerate && repeated >= TOPIC_CONCEPT_REPEAT_LIMIT_7D) {
-          rejectionStats.topicRepetition += 1;
+          rejectCandidate("topicRepetition");
           continue;
         }
 
@@ -399,6 +452,9 @@ export const generateDailyPaper = async ({ forceDate, triggeredBy = "system", ad
         });
         generatedTexts.push(candidate.questionText);
         selectedHashes.add(hash);
+        if (excludeSetId) {
+          void appendAiExcludeSet(excludeSetId, [hash]);
+        }
         topicConceptCounts[conceptKey] = repeated + 1;
         accepted = true;
       }